@@ -19,22 +19,46 @@ __all__ = ['extract_circuit']
 from fractions import Fraction
 import itertools
 
+import numpy as np
+
 from .utils import EdgeType, VertexType, toggle_edge
 from .linalg import Mat2, Z2
 from .simplify import id_simp, tcount
 from .rules import apply_rule, pivot, match_spider_parallel, spider
 from .circuit import Circuit
-from .circuit.gates import Gate, ParityPhase, CNOT, HAD, ZPhase, CZ, InitAncilla
+from .circuit.gates import Gate, ParityPhase, CNOT, HAD, ZPhase, CZ, SWAP, InitAncilla
 
 from .graph.base import BaseGraph, VT, ET
 
 from typing import List, Optional, Tuple, Dict, Set, Union
 
+try:
+    from .extract_c import find_minimal_sums as find_minimal_sums_fast # type: ignore
+except ImportError:
+    find_minimal_sums_fast = None
+
 
-def bi_adj(g: BaseGraph[VT,ET], vs:List[VT], ws:List[VT]) -> Mat2:
+def bi_adj(
+        g: BaseGraph[VT,ET], 
+        vs:List[VT], 
+        ws:List[VT], 
+        neighbour_cache:Optional[Dict[VT,List[VT]]]=None
+        ) -> Mat2:
     """Construct a biadjacency matrix between the supplied list of vertices
-    ``vs`` and ``ws``."""
-    return Mat2([[1 if g.connected(v,w) else 0 for v in vs] for w in ws])
+    ``vs`` and ``ws``.
+
+    The neighbourhood of every vertex in ``ws`` is queried only once. When a dictionary
+    ``neighbour_cache`` is supplied, it is used as a cache for these neighbourhoods, so that
+    consecutive calls on an unchanged graph do not have to query the graph again."""
+    if neighbour_cache is None: neighbour_cache = dict()
+    index = {v:j for j,v in enumerate(vs)}
+    data = np.zeros((len(ws),len(vs)), dtype=np.uint8)
+    for i,w in enumerate(ws):
+        if w not in neighbour_cache:
+            neighbour_cache[w] = list(g.neighbours(w))
+        cols = [index[v] for v in neighbour_cache[w] if v in index]
+        data[i,cols] = 1
+    return Mat2(data.tolist()) # type: ignore
 
 def connectivity_from_biadj(
         g: BaseGraph[VT,ET], 
@@ -44,12 +68,16 @@ def connectivity_from_biadj(
         edgetype:EdgeType.Type=EdgeType.HADAMARD):
     """Replace the connectivity in ``g`` between the vertices in ``left`` and ``right``
     by the biadjacency matrix ``m``. The edges will be of type ``edgetype``."""
+    left_index = {v:j for j,v in enumerate(left)}
+    remove: List[ET] = []
+    add: List[ET] = []
     for i in range(len(right)):
-        for j in range(len(left)):
-            if m.data[i][j] and not g.connected(right[i],left[j]):
-                g.add_edge(g.edge(right[i],left[j]),edgetype)
-            elif not m.data[i][j] and g.connected(right[i],left[j]):
-                g.remove_edge(g.edge(right[i],left[j]))
+        have = {left_index[v] for v in g.neighbours(right[i]) if v in left_index}
+        want = {j for j,a in enumerate(m.data[i]) if a}
+        remove.extend(g.edge(right[i],left[j]) for j in sorted(have - want))
+        add.extend(g.edge(right[i],left[j]) for j in sorted(want - have))
+    g.remove_edges(remove)
+    g.add_edges(add,edgetype)
 
 def streaming_extract(
         g:BaseGraph[VT,ET], 
@@ -65,19 +93,21 @@ def permutation_as_swaps(perm:Dict[int,int]) -> List[Tuple[int,int]]:
 
     Args:
         perm: A dictionary where both keys and values take values in 0,1,...,n."""
+    return _swaps_from_perm([perm[i] for i in range(len(perm))])
+
+def _swaps_from_perm(p: List[int]) -> List[Tuple[int,int]]:
+    """Version of :func:`permutation_as_swaps` for a permutation given as a list."""
+    visited = [False]*len(p)
     swaps = []
-    l = [perm[i] for i in range(len(perm))]
-    pinv = {v:k for k,v in perm.items()}
-    linv = [pinv[i] for i in range(len(pinv))]
-    for i in range(len(perm)):
-        if l[i] == i: continue
-        t1 = l[i]
-        t2 = linv[i]
-        swaps.append((i,t2))
-        #l[i] = i
-        #linv[i] = i
-        l[t2] = t1
-        linv[t1] = t2
+    # Each cycle (i, perm[i], perm[perm[i]], ...) of length L is realised by L-1 swaps with i
+    for i in range(len(p)):
+        if visited[i] or p[i] == i: continue
+        visited[i] = True
+        j = p[i]
+        while j != i:
+            visited[j] = True
+            swaps.append((i,j))
+            j = p[j]
     return swaps
 
 
@@ -169,19 +199,21 @@ def find_minimal_sums(m: Mat2) -> Optional[Tuple[int,...]]:
     """Returns a list of rows in m that can be added together to reduce one of the rows so that
     it only contains a single 1. Used in :func:`greedy_reduction`"""
     r = m.rows()
-    d = m.data
-    if any(sum(r)==1 for r in d): return tuple()
-    combs:  Dict[Tuple[int,...],List[Z2]] = {(i,):d[i] for i in range(r)}
-    combs2: Dict[Tuple[int,...],List[Z2]] = {}
+    # We represent the rows as bitmasks, so that adding rows is a single XOR,
+    # and a row contains a single 1 precisely when it is a power of two.
+    d = [sum(1 << j for j,v in enumerate(row) if v) for row in m.data]
+    if any(x and not x & (x-1) for x in d): return tuple()
+    if find_minimal_sums_fast is not None:
+        return find_minimal_sums_fast(d, m.cols())
+    combs:  Dict[Tuple[int,...],int] = {(i,):d[i] for i in range(r)}
+    combs2: Dict[Tuple[int,...],int] = {}
     iterations = 0
     while True:
         combs2 = {}
         for index,l in combs.items():
-            for k in range(max(index)+1,r):
-                #Unrolled xor_rows(combs[index],d[k])
-                row: List[Z2] = [0 if v1==v2 else 1 for v1,v2 in zip(combs[index],d[k])]
-                #row = xor_rows(combs[index],d[k])
-                if sum(row) == 1:
+            for k in range(index[-1]+1,r):
+                row = l ^ d[k]
+                if row and not row & (row-1):
                     return (*index,k)
                 combs2[(*index,k)] = row
                 iterations += 1
@@ -222,40 +254,25 @@ def greedy_reduction(m: Mat2) -> Optional[List[Tuple[int,int]]]:
         indices.remove(control)
     return result
 
-# O(N^3)
 def max_overlap(cz_matrix: Mat2) -> Tuple[Tuple[int,int],List[int]]:
     """Given an adjacency matrix of qubit connectivity of a CZ circuit, returns:
     a) the rows which have the maximum inner product
     b) the list of common qubits between these rows.
     Used in :func:`extract_circuit` to more optimally place CZ gates. 
     """
-    N = len(cz_matrix.data[0])
-
-    max_inner_product = 0
-    final_common_qbs = list()
-    overlapping_rows = (-1,-1)
-    for i in range(N):
-        for j in range(i+1,N):
-            inner_product = 0
-            i_czs = 0
-            j_czs = 0
-            common_qbs = list()
-            for k in range(N):
-                i_czs += cz_matrix.data[i][k]
-                j_czs += cz_matrix.data[j][k]
-
-                if cz_matrix.data[i][k]!=0 and cz_matrix.data[j][k]!=0:
-                    inner_product+=1
-                    common_qbs.append(k)
-
-            if inner_product > max_inner_product:
-                max_inner_product = inner_product
-                if i_czs < j_czs:
-                    overlapping_rows = (j,i)
-                else:
-                    overlapping_rows = (i,j)
-                final_common_qbs = common_qbs
-    return (overlapping_rows,final_common_qbs)
+    m = np.asarray(cz_matrix.data, dtype=np.int64)
+    N = m.shape[1]
+    m = m[:N]
+    # inner products of all pairs of rows i < j
+    inner_products = np.triu(m @ m.T, 1)
+    i, j = (int(k) for k in np.unravel_index(np.argmax(inner_products), inner_products.shape))
+    if inner_products[i,j] == 0:
+        return ((-1,-1),[])
+    if m[i].sum() < m[j].sum():
+        overlapping_rows = (j,i)
+    else:
+        overlapping_rows = (i,j)
+    return (overlapping_rows, np.flatnonzero(m[i] & m[j]).tolist())
 
 def filter_duplicate_cnots(cnots: List[CNOT]) -> List[CNOT]:
     """Cancels adjacent CNOT gates in a list of CNOT gates."""
@@ -287,19 +304,25 @@ def extract_circuit(
     rs = g.rows()   # ...to reflect changes to the graph, so that when...
     ty = g.types()  # ... g.set_row/g.set_qubit is called, these things update directly to reflect that
     phases = g.phases()
-    c = Circuit(g.qubit_count())
+    # The inputs and outputs do not change during the extraction, so we can test membership in sets
+    inputs = set(g.inputs)
+    outputs = set(g.outputs)
+    # Computing the qubit count scans all the vertices, so we only do it once. The new vertices
+    # introduced during the extraction all get the qubit index of an input, so it does not increase.
+    qubit_count = g.qubit_count()
+    c = Circuit(qubit_count)
 
     gadgets = {}
     for v in g.vertices():
-        if g.vertex_degree(v) == 1 and v not in g.inputs and v not in g.outputs:
-            n = list(g.neighbours(v))[0]
+        if g.vertex_degree(v) == 1 and v not in inputs and v not in outputs:
+            n = next(iter(g.neighbours(v)))
             gadgets[n] = v
     
     qubit_map: Dict[VT,int] = dict()
     frontier = []
     for i,o in enumerate(g.outputs):
-        v = list(g.neighbours(o))[0]
-        if v in g.inputs: continue
+        v = next(iter(g.neighbours(o)))
+        if v in inputs: continue
         frontier.append(v)
         qubit_map[v] = i
         
@@ -307,90 +330,107 @@ def extract_circuit(
     q: Union[float,int]
     
     while True:
+        # The neighbourhoods of the frontier vertices are queried once per iteration,
+        # and are kept up to date below whenever we change the edges of a frontier vertex.
+        frontier_neighbours = {v: list(g.neighbours(v)) for v in frontier}
+        frontier_outputs: Dict[VT,VT] = dict()
         # preprocessing
         for v in frontier: # First removing single qubit gates
             q = qubit_map[v]
-            b = [w for w in g.neighbours(v) if w in g.outputs][0]
-            e = g.edge(v,b)
-            if g.edge_type(e) == 2: # Hadamard edge
-                c.add_gate("HAD",q)
-                g.set_edge_type(e,1)
+            b = next(w for w in frontier_neighbours[v] if w in outputs)
+            frontier_outputs[v] = b
+            if g.edge_type_between(v,b) == 2: # Hadamard edge
+                c.add_gate(HAD(q))
+                g.set_edge_type(g.edge(v,b),1)
             if phases[v]: 
-                c.add_gate("ZPhase", q, phases[v])
+                c.add_gate(ZPhase(q, phases[v]))
                 g.set_phase(v,0)
         # And now on to CZ gates
-        cz_mat = Mat2([[0 for i in range(g.qubit_count())] for j in range(g.qubit_count())])
+        cz_mat = Mat2([[0 for i in range(qubit_count)] for j in range(qubit_count)])
+        cz_edges = []
         for v in frontier:
-            for w in list(g.neighbours(v)):
+            for w in list(frontier_neighbours[v]):
                 if w in frontier:
                     cz_mat.data[qubit_map[v]][qubit_map[w]] = 1
                     cz_mat.data[qubit_map[w]][qubit_map[v]] = 1
-                    g.remove_edge(g.edge(v,w))
+                    cz_edges.append(g.edge(v,w))
+                    frontier_neighbours[v].remove(w)
+                    frontier_neighbours[w].remove(v)
+        g.remove_edges(cz_edges)
         
         if optimize_czs:
             overlap_data = max_overlap(cz_mat)
             while len(overlap_data[1]) > 2: #there are enough common qubits to be worth optimising
                 i,j = overlap_data[0][0], overlap_data[0][1]
                 czs_saved += len(overlap_data[1])-2
-                c.add_gate("CNOT",i,j)
+                c.add_gate(CNOT(i,j))
                 for qb in overlap_data[1]:
-                    c.add_gate("CZ",j,qb)
+                    c.add_gate(CZ(j,qb))
                     cz_mat.data[i][qb]=0
                     cz_mat.data[j][qb]=0
                     cz_mat.data[qb][i]=0
                     cz_mat.data[qb][j]=0
-                c.add_gate("CNOT",i,j)
+                c.add_gate(CNOT(i,j))
                 overlap_data = max_overlap(cz_mat)
 
-        for i in range(g.qubit_count()):
-            for j in range(i+1,g.qubit_count()):
-                if cz_mat.data[i][j]==1:
-                    c.add_gate("CZ",i,j)
+        cz_pairs = np.nonzero(np.triu(np.asarray(cz_mat.data).reshape(qubit_count,qubit_count), 1))
+        c.gates.extend(CZ(i,j) for i,j in zip(*(l.tolist() for l in cz_pairs)))
         
         # Now we can proceed with the actual extraction
         # First make sure that frontier is connected in correct way to inputs
-        neighbour_set = set()
-        for v in frontier.copy():
-            d = [w for w in g.neighbours(v) if w not in g.outputs]
-            if any(w in g.inputs for w in d): #frontier vertex v is connected to an input
+        neighbour_set: Set[VT] = set()
+        finished = set()
+        for v in frontier:
+            d = [w for w in frontier_neighbours[v] if w not in outputs]
+            if any(w in inputs for w in d): #frontier vertex v is connected to an input
                 if len(d) == 1: # Only connected to input, remove from frontier
-                    frontier.remove(v)
+                    finished.add(v)
                     continue
                 # We disconnect v from the input b via a new spider
-                b = [w for w in d if w in g.inputs][0]
+                b = next(w for w in d if w in inputs)
                 q = qs[b]
                 r = rs[b]
                 w = g.add_vertex(1,q,r+1)
-                e = g.edge(v,b)
-                et = g.edge_type(e)
-                g.remove_edge(e)
+                et = g.edge_type_between(v,b)
+                g.remove_edge(g.edge(v,b))
                 g.add_edge(g.edge(v,w),2)
                 g.add_edge(g.edge(w,b),toggle_edge(et))
-                d.remove(b)
-                d.append(w)
-            neighbour_set.update(d)
+                frontier_neighbours[v].remove(b)
+                frontier_neighbours[v].append(w)
+                # The new spider takes the place of b, after the other neighbours of v
+                neighbour_set.update(u for u in d if u != b)
+                neighbour_set.add(w)
+            else:
+                neighbour_set.update(d)
+        if finished: frontier = [v for v in frontier if v not in finished]
         
         if not frontier: break # No more vertices to be processed. We are done.
         
         # First we check if there is a phase gadget in the way
         removed_gadget = False
-        for w in neighbour_set:
-            if w not in gadgets: continue
-            for v in g.neighbours(w):
-                if v in frontier:
-                    apply_rule(g,pivot,[(w,v,[],[o for o in g.neighbours(v) if o in g.outputs])]) # type: ignore
-                    frontier.remove(v)
-                    del gadgets[w]
-                    frontier.append(w)
-                    qubit_map[w] = qubit_map[v]
-                    removed_gadget = True
-                    break
+        # isdisjoint iterates over the smaller of the two, so this is cheap when no gadget is adjacent
+        gadget_neighbours = [] if gadgets.keys().isdisjoint(neighbour_set) else [w for w in neighbour_set if w in gadgets]
+        frontier_set = set(frontier)
+        for w in gadget_neighbours:
+            candidates = [u for u in g.neighbours(w) if u in frontier_set]
+            if not candidates: continue
+            v = candidates[0]
+            apply_rule(g,pivot,[(w,v,[],[o for o in g.neighbours(v) if o in outputs])]) # type: ignore
+            frontier.remove(v)
+            frontier_set.remove(v)
+            del gadgets[w]
+            frontier.append(w)
+            frontier_set.add(w)
+            qubit_map[w] = qubit_map[v]
+            removed_gadget = True
         if removed_gadget: # There was indeed a gadget in the way. Go back to the top
             continue
             
         neighbours = list(neighbour_set)
-        m = bi_adj(g,neighbours,frontier)
-        if all(sum(row)!=1 for row in m.data): # No easy vertex
+        m = bi_adj(g,neighbours,frontier,frontier_neighbours)
+        M = np.asarray(m.data, dtype=np.uint8).reshape(m.rows(), len(neighbours))
+        weights = M.sum(axis=1)
+        if not (weights == 1).any(): # No easy vertex
             if optimize_cnots>1:
                  greedy_operations = greedy_reduction(m)
             else: greedy_operations = None
@@ -401,18 +441,21 @@ def extract_circuit(
             if greedy_operations is None or (optimize_cnots == 3 and len(greedy)>1):
                 perm = column_optimal_swap(m)
                 perm = {v:k for k,v in perm.items()}
-                neighbours2 = [neighbours[perm[i]] for i in range(len(neighbours))]
-                m2 = bi_adj(g, neighbours2, frontier)
+                perm_cols = [perm[i] for i in range(len(neighbours))]
+                neighbours2 = [neighbours[j] for j in perm_cols]
+                # Permuting the columns of m gives bi_adj(g, neighbours2, frontier)
+                M2 = M[:, perm_cols]
+                m2 = Mat2(M2.tolist()) # type: ignore
                 if optimize_cnots > 0:
                     cnots = m2.to_cnots(optimize=True)
                 else:
                     cnots = m2.to_cnots(optimize=False)
                 cnots = filter_duplicate_cnots(cnots) # Since the matrix is not square, the algorithm sometimes introduces duplicates
                 if greedy_operations is not None:
-                    m3 = m2.copy()
+                    # M2 is a copy of m2, so we can apply the CNOTs to it directly
                     for cnot in cnots:
-                        m3.row_add(cnot.target,cnot.control)
-                    reductions = sum(1 for row in m3.data if sum(row)==1)
+                        M2[cnot.control] ^= M2[cnot.target]
+                    reductions = int((M2.sum(axis=1) == 1).sum())
                     if greedy and (len(cnots)/reductions > len(greedy)-0.1):
                         if not quiet: print("Found greedy reduction with", len(greedy), "CNOTs")
                         cnots = greedy
@@ -421,29 +464,28 @@ def extract_circuit(
                         m = m2
                         if not quiet: print("Gaussian elimination with", len(cnots), "CNOTs")
             # We now have a set of CNOTs that suffice to extract at least one vertex.
+            # We apply them to a copy of m, and keep track of the number of extractable rows after each CNOT.
+            # The row weights of m are those computed above, as permuting the columns does not change them.
             m2 = m.copy()
+            row_weights = weights.tolist()
+            extractable_counts = [row_weights.count(1)]
             for cnot in cnots:
                 m2.row_add(cnot.target,cnot.control)
-            extractable = set()
-            for i, row in enumerate(m2.data):
-                if sum(row) == 1:
-                    extractable.add(i)
-            # We now know which vertices are extractable, and hence the CNOTs on qubits that do not involved
+                row_weights[cnot.control] = sum(m2.data[cnot.control])
+                extractable_counts.append(row_weights.count(1))
+            # We now know how many vertices are extractable, and hence the CNOTs on qubits that do not involved
             # these vertices aren't necessary.
             # So first, we get rid of all the CNOTs that happen in the Gaussian elimination after 
             # all the extractable vertices have become extractable
-            m2 = m.copy()
-            for count, cnot in enumerate(cnots):
-                if sum(1 for row in m2.data if sum(row)==1) == len(extractable): #extractable rows equal to maximum
-                    cnots = cnots[:count] # So we do not need the remainder of the CNOTs
-                    break
-                m2.row_add(cnot.target, cnot.control)
-            # We now recalculate which vertices were extractable, because the deleted cnots
-            # might have acted to swap this vertex around some.
-            extractable = set()
-            for i, row in enumerate(m2.data):
-                if sum(row) == 1:
-                    extractable.add(i)
+            count = extractable_counts.index(extractable_counts[-1])
+            # We undo the deleted cnots on m2, because they might have acted to swap an extractable vertex around some.
+            # A row addition is its own inverse, so it suffices to apply them again in reverse order.
+            for cnot in reversed(cnots[count:]):
+                m2.row_add(cnot.target,cnot.control)
+                row_weights[cnot.control] = sum(m2.data[cnot.control])
+            cnots = cnots[:count] # So we do not need the remainder of the CNOTs
+            # We now recalculate which vertices were extractable
+            extractable = {i for i,w in enumerate(row_weights) if w == 1}
             # And now we try to get rid of some more CNOTs, that can be commuted to the end of the CNOT circuit
             # without changing extractability.
             necessary_cnots = []
@@ -464,58 +506,60 @@ def extract_circuit(
                 if cnot.control not in blocked: blocked[cnot.control] = 'G' # 'G' stands for Green
                 if cnot.target not in blocked: blocked[cnot.target] = 'R' # 'R' stands for Red
             if not quiet: print("Actual realization required", len(necessary_cnots), "CNOTs")
-            cnots = []
+            # We apply the CNOTs to m by XORing the rows of a NumPy copy, and write it back once
+            M = np.asarray(m.data, dtype=np.uint8).reshape(m.rows(), len(neighbours))
             for cnot in reversed(necessary_cnots):
-                m.row_add(cnot.target,cnot.control)
-                cnots.append(CNOT(qubit_map[frontier[cnot.control]],qubit_map[frontier[cnot.target]]))
+                M[cnot.control] ^= M[cnot.target]
+            m.data = M.tolist() # type: ignore
+            fq = [qubit_map[v] for v in frontier] # The qubit of every row of m
+            cnots = [CNOT(fq[cnot.control],fq[cnot.target]) for cnot in reversed(necessary_cnots)]
             #for cnot in cnots:
             #    m.row_add(cnot.target,cnot.control)
             #    c.add_gate("CNOT",qubit_map[frontier[cnot.control]],qubit_map[frontier[cnot.target]])
             connectivity_from_biadj(g,m,neighbours,frontier)
+            weights = M.sum(axis=1)
         else:
             if not quiet: print("Simple vertex")
             cnots = []
         good_verts = dict()
-        for i, row in enumerate(m.data):
-            if sum(row) == 1:
-                v = frontier[i]
-                w = neighbours[[j for j in range(len(row)) if row[j]][0]]
-                good_verts[v] = w
+        singles = np.flatnonzero(weights == 1)
+        if len(singles): # The column of the unique 1 in each of these rows gives the vertex that can be extracted
+            for i, j in zip(singles.tolist(), M[singles].argmax(axis=1).tolist()):
+                good_verts[frontier[i]] = neighbours[j]
         if not good_verts: raise Exception("No extractable vertex found. Something went wrong")
-        hads = []
-        for v,w in good_verts.items(): # Update frontier vertices
-            hads.append(qubit_map[v])
-            #c.add_gate("HAD",qubit_map[v])
+        # Update frontier vertices: each extracted vertex v is removed, and its neighbour w is connected to the output of v
+        hads = [qubit_map[v] for v in good_verts]
+        for v,w in good_verts.items():
             qubit_map[w] = qubit_map[v]
-            b = [o for o in g.neighbours(v) if o in g.outputs][0]
-            g.remove_vertex(v)
-            g.add_edge(g.edge(w,b))
-            frontier.remove(v)
-            frontier.append(w)
+        g.remove_vertices(list(good_verts))
+        g.add_edges([g.edge(w,frontier_outputs[v]) for v,w in good_verts.items()])
+        # Replace the extracted vertices by their neighbours at the end of the frontier
+        frontier = [v for v in frontier if v not in good_verts]
+        frontier.extend(good_verts.values())
         if not quiet: print("Vertices extracted:", len(good_verts))
-        for cnot in cnots: c.add_gate(cnot)
-        for h in hads: c.add_gate("HAD",h)
+        c.gates.extend(cnots)
+        c.gates.extend(HAD(h) for h in hads)
             
     if optimize_czs:
         if not quiet: print("CZ gates saved:", czs_saved)
     # Outside of loop. Finish up the permutation
-    id_simp(g,quiet=True) # Now the graph should only contain inputs and outputs
-    swap_map = {}
-    leftover_swaps = False
-    for q,v in enumerate(g.outputs): # Finally, check for the last layer of Hadamards, and see if swap gates need to be applied.
-        inp = list(g.neighbours(v))[0]
-        if inp not in g.inputs: 
-            raise TypeError("Algorithm failed: Not fully reducable")
-            return c
-        if g.edge_type(g.edge(v,inp)) == 2:
-            c.add_gate("HAD", q)
+    # The frontier vertices that are only connected to an input are still there, unless there were none
+    if g.num_vertices() != len(g.inputs) + len(g.outputs):
+        id_simp(g,quiet=True) # Now the graph should only contain inputs and outputs
+    # Finally, check for the last layer of Hadamards, and see if swap gates need to be applied.
+    input_index = {v:i for i,v in enumerate(g.inputs)}
+    output_inputs = [next(iter(g.neighbours(v))) for v in g.outputs]
+    if not all(inp in input_index for inp in output_inputs):
+        raise TypeError("Algorithm failed: Not fully reducable")
+    for q,(v,inp) in enumerate(zip(g.outputs,output_inputs)):
+        if g.edge_type_between(v,inp) == EdgeType.HADAMARD:
+            c.add_gate(HAD(q))
             g.set_edge_type(g.edge(v,inp),EdgeType.SIMPLE)
-        q2 = g.inputs.index(inp)
-        if q2 != q: leftover_swaps = True
-        swap_map[q] = q2
-    if leftover_swaps: 
-        for t1, t2 in permutation_as_swaps(swap_map):
-            c.add_gate("SWAP", t1, t2)
+    # Output q is connected to input swap_perm[q]
+    swap_perm = [input_index[inp] for inp in output_inputs]
+    if swap_perm != list(range(len(swap_perm))):
+        for t1, t2 in _swaps_from_perm(swap_perm):
+            c.add_gate(SWAP(t1,t2))
     # Since we were extracting from right to left, we reverse the order of the gates
-    c.gates = list(reversed(c.gates))
+    c.gates.reverse()
     return c
\ No newline at end of file
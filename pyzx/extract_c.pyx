@@ -0,0 +1,73 @@
+# cython: language_level=3
+# Optional compiled helpers for pyzx.extract. Build in place with
+#     cythonize -i pyzx/extract_c.pyx
+# When the module is not available, the pure Python versions are used.
+
+cimport cython
+from libc.stdint cimport uint64_t, int64_t
+from libc.stdlib cimport malloc, free
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef bint single_bit(uint64_t *row, int words):
+    cdef int w
+    cdef int found = 0
+    for w in range(words):
+        if row[w]:
+            if found or row[w] & (row[w] - 1): return False
+            found = 1
+    return found
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def find_minimal_sums(rows, int cols, int max_iterations=100000):
+    """Compiled version of :func:`pyzx.extract.find_minimal_sums`, for a matrix with ``cols`` columns
+    whose rows are given as integer bitmasks, none of which has a single bit set.
+    The combinations of rows are explored in the same order as in the Python version,
+    but a combination is stored as its last row, its value and the combination it extends."""
+    cdef int r = len(rows)
+    cdef int words = max(1, (cols + 63) // 64)
+    cdef int64_t capacity = max_iterations + 2*r + 1
+    cdef uint64_t *d = <uint64_t *> malloc(r * words * sizeof(uint64_t))
+    cdef uint64_t *value = <uint64_t *> malloc(capacity * words * sizeof(uint64_t))
+    cdef int64_t *parent = <int64_t *> malloc(capacity * sizeof(int64_t))
+    cdef int *last = <int *> malloc(capacity * sizeof(int))
+    cdef int64_t n, lo, hi, e, iterations
+    cdef int i, k, w
+    cdef uint64_t *row
+    if d == NULL or value == NULL or parent == NULL or last == NULL:
+        free(d); free(value); free(parent); free(last)
+        raise MemoryError()
+    try:
+        for i in range(r):
+            x = rows[i]
+            for w in range(words):
+                d[i*words + w] = (x >> (64*w)) & 0xFFFFFFFFFFFFFFFF
+                value[i*words + w] = d[i*words + w]
+            parent[i] = -1
+            last[i] = i
+        n = r
+        lo, hi = 0, r
+        iterations = 0
+        while True:
+            for e in range(lo, hi):
+                for k in range(last[e]+1, r):
+                    row = value + n*words
+                    for w in range(words):
+                        row[w] = value[e*words + w] ^ d[k*words + w]
+                    if single_bit(row, words):
+                        result = [k]
+                        while e != -1:
+                            result.append(last[e])
+                            e = parent[e]
+                        return tuple(reversed(result))
+                    parent[n] = e
+                    last[n] = k
+                    n += 1
+                    iterations += 1
+                if iterations > max_iterations:
+                    return None
+            if n == hi: return None
+            lo, hi = hi, n
+    finally:
+        free(d); free(value); free(parent); free(last)
@@ -64,20 +64,21 @@ def gflow(g: BaseGraph[VT,ET]) -> Optional[Tuple[Dict[VT,int], Dict[VT,Set[VT]],
 
     inputs = set(g.inputs)
     processed = set(g.outputs)
-    vertices = set(g.vertices())
     k = 1
     while True:
         correct = set()
         #unprocessed = list()
         processed_prime = [v for v in processed.difference(inputs) if any(w not in processed for w in g.neighbours(v))]
-        candidates = [v for v in vertices.difference(processed) if any(w in processed_prime for w in g.neighbours(v))]
+        # The candidates are exactly the unprocessed neighbours of processed_prime,
+        # so we find them from there instead of scanning all the vertices of the graph
+        candidates = list({w for v in processed_prime for w in g.neighbours(v) if w not in processed})
         
         zerovec = Mat2([[0] for i in range(len(candidates))])
         #print(unprocessed, processed_prime, zerovec)
         m = bi_adj(g, processed_prime, candidates)
-        for u in candidates:
+        for i,u in enumerate(candidates):
             vu = zerovec.copy()
-            vu.data[candidates.index(u)] = [1]
+            vu.data[i] = [1]
             x = m.solve(vu)
             if x:
                 correct.add(u)
@@ -315,15 +315,19 @@ class BaseGraph(Generic[VT, ET], metaclass=DocstringMeta):
             self.set_row(v, self.row(v)+rdepth)
 
         vtab = {}
+        boundary = set(replace.inputs).union(replace.outputs)
         for v in replace.vertices():
-            if v in replace.inputs or v in replace.outputs: continue
+            if v in boundary: continue
             vtab[v] = self.add_vertex(replace.type(v),replace.qubit(v),
                                 replace.row(v)+left_row,replace.phase(v))
+        # The vertices on the left and right row indexed by their qubit (keeping the first one of each qubit)
+        left_at = {self.qubit(i): i for i in reversed(qleft)}
         for v in replace.inputs:
-            vtab[v] = [i for i in qleft if self.qubit(i) == replace.qubit(v)][0]
+            vtab[v] = left_at[replace.qubit(v)]
 
+        right_at = {self.qubit(i): i for i in reversed(qright)}
         for v in replace.outputs:
-            vtab[v] = [i for i in qright if self.qubit(i) == replace.qubit(v)][0]
+            vtab[v] = right_at[replace.qubit(v)]
 
         etab = {e:self.edge(vtab[replace.edge_s(e)],vtab[replace.edge_t(e)]) for e in replace.edges()}
         self.add_edges(etab.values())
@@ -339,11 +343,12 @@ class BaseGraph(Generic[VT, ET], metaclass=DocstringMeta):
         other = other.copy()
         other.normalise()
         self.scalar.mult_with_scalar(other.scalar)
+        other_inputs = {other.qubit(v): v for v in reversed(other.inputs)}
         for o in self.outputs:
             q = self.qubit(o)
             e = list(self.incident_edges(o))[0]
             if self.edge_type(e) == EdgeType.HADAMARD:
-                i = [v for v in other.inputs if other.qubit(v)==q][0]
+                i = other_inputs[q]
                 e = list(other.incident_edges(i))[0]
                 other.set_edge_type(e, toggle_edge(other.edge_type(e)))
         d = self.depth()
@@ -850,6 +855,10 @@ class BaseGraph(Generic[VT, ET], metaclass=DocstringMeta):
         ``EdgeType.SIMPLE`` if it is regular, ``EdgeType.HADAMARD`` if it is a Hadamard edge,
         0 if the edge is not in the graph."""
         raise NotImplementedError("Not implemented on backend " + type(self).backend)
+    def edge_type_between(self, v1: VT, v2: VT) -> EdgeType.Type:
+        """Returns the type of the edge between v1 and v2 (or 0 if they are not connected),
+        without first constructing the edge object, as in ``edge_type(edge(v1,v2))``."""
+        return self.edge_type(self.edge(v1,v2))
     def set_edge_type(self, e: ET, t: EdgeType.Type) -> None:
         """Sets the type of the given edge."""
         raise NotImplementedError("Not implemented on backend " + type(self).backend)
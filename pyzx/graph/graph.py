@@ -25,7 +25,7 @@ def Graph(backend:Optional[str]=None) -> BaseGraph:
 	"""Returns an instance of an implementation of :class:`~pyzx.graph.base.BaseGraph`. 
 	By default :class:`~pyzx.graph.graph_s.GraphS` is used. 
 	Currently ``backend`` is allowed to be `simple` (for the default),
-	or 'graph_tool' and 'igraph'.
+	or 'graph_tool', 'igraph' and 'rustworkx'.
 	This method is the preferred way to instantiate a ZX-diagram in PyZX.
 
 	Example:
@@ -41,6 +41,7 @@ def Graph(backend:Optional[str]=None) -> BaseGraph:
 	if backend == 'graph_tool': 
 		return GraphGT()
 	if backend == 'igraph': return GraphIG()
+	if backend == 'rustworkx': return GraphRX()
 	return GraphS()
 
 Graph.from_json = GraphS.from_json # type: ignore
@@ -57,3 +58,9 @@ try:
 	backends['igraph'] = ig 
 except ImportError:
 	pass
+try:
+	import rustworkx as rx
+	from .graph_rx import GraphRX
+	backends['rustworkx'] = rx # type: ignore
+except ImportError:
+	pass
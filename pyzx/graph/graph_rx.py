@@ -0,0 +1,201 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fractions import Fraction
+from typing import Tuple, Dict, Any
+
+try:
+	import rustworkx as rx
+except ImportError:
+	rx = None # type: ignore
+
+from .base import BaseGraph
+
+from ..utils import VertexType, EdgeType, FractionLike, FloatInt
+
+class GraphRX(BaseGraph[int,Tuple[int,int]]):
+	"""Implementation of :class:`~graph.base.BaseGraph` that stores the connectivity
+	of the diagram in a ``rustworkx.PyGraph``, so that neighbourhood and edge queries
+	are answered by Rust code. 
+	The vertex data is stored in the same way as in :class:`~pyzx.graph.graph_s.GraphS`."""
+	backend = 'rustworkx'
+
+	#The documentation of what these methods do 
+	#can be found in base.BaseGraph
+	def __init__(self):
+		BaseGraph.__init__(self)
+		# rustworkx reuses the indices of removed nodes, so we keep our own vertex names
+		# and store them as the weights of the nodes.
+		self.graph 										= rx.PyGraph(multigraph=False)
+		self._node: Dict[int,int]						= dict()
+		self._vindex: int 								= 0
+		self.ty: Dict[int,VertexType.Type]  			= dict()
+		self._phase: Dict[int, FractionLike]			= dict()
+		self._qindex: Dict[int, FloatInt]				= dict()
+		self._maxq: FloatInt							= -1
+		self._rindex: Dict[int, FloatInt] 				= dict()
+		self._maxr: FloatInt							= -1
+		
+		self._vdata: Dict[int,Any] 						= dict()
+		
+
+	def vindex(self): return self._vindex
+	def depth(self): 
+		if self._rindex: self._maxr = max(self._rindex.values())
+		else: self._maxr = -1
+		return self._maxr
+	def qubit_count(self): 
+		if self._qindex: self._maxq = max(self._qindex.values())
+		else: self._maxq = -1
+		return self._maxq + 1
+
+	def add_vertices(self, amount):
+		for i in range(self._vindex, self._vindex + amount):
+			self._node[i] = self.graph.add_node(i)
+			self.ty[i] = VertexType.BOUNDARY
+			self._phase[i] = 0
+		self._vindex += amount
+		return range(self._vindex - amount, self._vindex)
+	def add_vertex_indexed(self, index):
+		"""Adds a vertex that is guaranteed to have the chosen index (i.e. 'name').
+		If the index isn't available, raises a ValueError.
+		This method is used in the editor to support undo, which requires vertices
+		to preserve their index."""
+		if index in self._node: raise ValueError("Vertex with this index already exists")
+		if index >= self._vindex: self._vindex = index+1
+		self._node[index] = self.graph.add_node(index)
+		self.ty[index] = VertexType.BOUNDARY
+		self._phase[index] = 0
+
+	def add_edges(self, edges, edgetype=EdgeType.SIMPLE):
+		n = self._node
+		self.graph.add_edges_from([(n[s],n[t],edgetype) for s,t in edges])
+
+	def remove_vertices(self, vertices):
+		for v in vertices:
+			self.graph.remove_node(self._node.pop(v))
+			del self.ty[v]
+			del self._phase[v]
+			try: del self._qindex[v]
+			except: pass
+			try: del self._rindex[v]
+			except: pass
+			try: del self.phase_index[v]
+			except: pass
+			self._vdata.pop(v,None)
+
+	def remove_vertex(self, vertex):
+		self.remove_vertices([vertex])
+
+	def remove_edges(self, edges):
+		n = self._node
+		self.graph.remove_edges_from([(n[s],n[t]) for s,t in edges])
+
+	def remove_edge(self, edge):
+		self.remove_edges([edge])
+
+	def num_vertices(self):
+		return self.graph.num_nodes()
+
+	def num_edges(self):
+		return self.graph.num_edges()
+
+	def vertices(self):
+		return self._node.keys()
+
+	def edges(self):
+		g = self.graph
+		for s,t in g.edge_list():
+			v0, v1 = g[s], g[t]
+			yield (v0,v1) if v0 < v1 else (v1,v0)
+
+	def edge(self, s, t):
+		return (s,t) if s < t else (t,s)
+	def edge_set(self):
+		return set(self.edges())
+	def edge_st(self, edge):
+		return edge
+
+	def neighbours(self, vertex):
+		g = self.graph
+		return [g[n] for n in g.neighbors(self._node[vertex])]
+
+	def vertex_degree(self, vertex):
+		return self.graph.degree(self._node[vertex])
+
+	def incident_edges(self, vertex):
+		return [(vertex, v1) if v1 > vertex else (v1, vertex) for v1 in self.neighbours(vertex)]
+
+	def connected(self,v1,v2):
+		return self.graph.has_edge(self._node[v1],self._node[v2])
+
+	def edge_type(self, e):
+		v1,v2 = e
+		try:
+			return self.graph.get_edge_data(self._node[v1],self._node[v2])
+		except (KeyError, rx.NoEdgeBetweenNodes):
+			return 0
+	def edge_type_between(self, v1, v2):
+		return self.edge_type((v1,v2))
+
+	def set_edge_type(self, e, t):
+		v1,v2 = e
+		self.graph.update_edge(self._node[v1],self._node[v2],t)
+
+	def type(self, vertex):
+		return self.ty[vertex]
+	def types(self):
+		return self.ty
+	def set_type(self, vertex, t):
+		self.ty[vertex] = t
+
+	def phase(self, vertex):
+		return self._phase.get(vertex,Fraction(1))
+	def phases(self):
+		return self._phase
+	def set_phase(self, vertex, phase):
+		self._phase[vertex] = Fraction(phase) % 2
+	def add_to_phase(self, vertex, phase):
+		self._phase[vertex] = (self._phase.get(vertex,Fraction(1)) + phase) % 2
+
+	def qubit(self, vertex):
+		return self._qindex.get(vertex,-1)
+	def qubits(self):
+		return self._qindex
+	def set_qubit(self, vertex, q):
+		if q > self._maxq: self._maxq = q
+		self._qindex[vertex] = q
+
+	def row(self, vertex):
+		return self._rindex.get(vertex, -1)
+	def rows(self):
+		return self._rindex
+	def set_row(self, vertex, r):
+		if r > self._maxr: self._maxr = r
+		self._rindex[vertex] = r
+
+	def vdata_keys(self, vertex):
+		return self._vdata.get(vertex, {}).keys()
+	def vdata(self, vertex, key, default=0):
+		if vertex in self._vdata:
+			return self._vdata[vertex].get(key,default)
+		else:
+			return default
+	def set_vdata(self, vertex, key, val):
+		if vertex in self._vdata:
+			self._vdata[vertex][key] = val
+		else:
+			self._vdata[vertex] = {key:val}
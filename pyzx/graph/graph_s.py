@@ -177,6 +177,11 @@ class GraphS(BaseGraph[int,Tuple[int,int]]):
 			return self.graph[v1][v2]
 		except KeyError:
 			return 0
+	def edge_type_between(self, v1, v2):
+		try:
+			return self.graph[v1][v2]
+		except KeyError:
+			return 0
 
 	def set_edge_type(self, e, t):
 		v1,v2 = e
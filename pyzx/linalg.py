@@ -15,6 +15,7 @@
 # limitations under the License.
 
 import math
+import operator
 from typing import Union, Any, Tuple, List, Optional, Set, Dict
 from typing_extensions import Literal
 
@@ -27,9 +28,350 @@ try:
 except ImportError:
    gauss_fast = None
 
+try:
+    import numba # type: ignore
+except ImportError:
+    numba = None # type: ignore
+
 Z2 = Literal[0,1]
 MatLike = Union[np.ndarray, List[List[Z2]]]
 
+def _pack_rows(data: MatLike, cols: int) -> np.ndarray:
+    """Packs the rows of a 0/1-matrix into an array of shape (rows, ceil(cols/64)) of 64-bit words.
+    Column ``j`` of a row is stored as bit ``j & 63`` of word ``j >> 6``."""
+    bits = np.asarray(data, dtype=np.uint8).reshape(len(data), cols)
+    packed = np.zeros((bits.shape[0], 8*((cols + 63) // 64)), dtype=np.uint8)
+    packed[:, :(cols + 7) // 8] = np.packbits(bits, axis=1, bitorder='little')
+    return packed.view('<u8').astype(np.uint64, copy=False)
+
+def _unpack_rows(packed: np.ndarray, cols: int) -> np.ndarray:
+    """Inverse of :func:`_pack_rows`."""
+    words = packed.astype('<u8', copy=False).view(np.uint8)
+    return np.unpackbits(words, axis=1, count=cols, bitorder='little')
+
+def _column(packed: np.ndarray, p: int) -> np.ndarray:
+    """Returns column ``p`` of a packed matrix as an array of zeros and ones."""
+    return (packed[:, p >> 6] >> np.uint64(p & 63)) & np.uint64(1)
+
+def _gauss_packed(
+        packed: np.ndarray, 
+        cols: int, 
+        full_reduce: bool, 
+        blocksize: int
+        ) -> Tuple[int, List[Tuple[int,int]]]:
+    """Performs the Gaussian elimination of :meth:`Mat2.gauss` in place on a matrix packed by
+    :func:`_pack_rows`, so that every row addition XORs 64 columns at a time.
+    Returns the rank together with the list of row operations ``(r0, r1)`` (meaning: add row r0 to r1)
+    in the order in which they were performed."""
+    rows = packed.shape[0]
+    ops: List[Tuple[int,int]] = []
+    pcols: List[int] = []
+
+    def eliminate(blockrows: range, i0: int, i1: int) -> None:
+        # search for duplicate chunks of 'blocksize' bits and eliminate them
+        w0, w1 = i0 >> 6, ((i1 - 1) >> 6) + 1
+        mask = np.zeros(w1 - w0, dtype=np.uint64)
+        for w in range(w0, w1):
+            lo, hi = max(i0, 64*w) - 64*w, min(i1, 64*(w+1)) - 64*w
+            mask[w - w0] = ((1 << hi) - 1) ^ ((1 << lo) - 1)
+        chunks = packed[:, w0:w1] & mask
+        nonzero = np.any(chunks, axis=1) # type: ignore
+        seen: Dict[bytes,int] = dict()
+        for r in blockrows:
+            if not nonzero[r]: continue
+            t = chunks[r].tobytes()
+            if t in seen:
+                packed[r] ^= packed[seen[t]]
+                ops.append((seen[t], r))
+            else:
+                seen[t] = r
+
+    pivot_row = 0
+    for sec in range(math.ceil(cols / blocksize)):
+        i0 = sec * blocksize
+        i1 = min(cols, (sec+1) * blocksize)
+        eliminate(range(pivot_row, rows), i0, i1)
+        for p in range(i0, i1):
+            if pivot_row == rows: break
+            nz = np.flatnonzero(_column(packed[pivot_row:], p))
+            if len(nz) == 0: continue
+            r0 = pivot_row + int(nz[0])
+            if r0 != pivot_row:
+                packed[pivot_row] ^= packed[r0]
+                ops.append((r0, pivot_row))
+            targets = pivot_row + 1 + np.flatnonzero(_column(packed[pivot_row+1:], p))
+            packed[targets] ^= packed[pivot_row]
+            ops.extend((pivot_row, int(r1)) for r1 in targets)
+            if full_reduce: pcols.append(p)
+            pivot_row += 1
+
+    rank = pivot_row
+
+    if full_reduce:
+        pivot_row -= 1
+        for sec in range(math.ceil(cols / blocksize) - 1, -1, -1):
+            i0 = sec * blocksize
+            i1 = min(cols, (sec+1) * blocksize)
+            eliminate(range(pivot_row, -1, -1), i0, i1)
+            while len(pcols) != 0 and i0 <= pcols[-1] < i1:
+                pcol = pcols.pop()
+                targets = np.flatnonzero(_column(packed[:pivot_row], pcol))
+                packed[targets] ^= packed[pivot_row]
+                ops.extend((pivot_row, int(r)) for r in targets)
+                pivot_row -= 1
+
+    return rank, ops
+
+if numba is not None:
+    @numba.njit(cache=True, nogil=True)
+    def _eliminate_chunks(packed, ops, nops, start, stop, step, i0, i1, seen, mask): # type: ignore
+        """Compiled version of the duplicate chunk elimination of :func:`_gauss_packed`,
+        considering the rows ``range(start, stop, step)``."""
+        words = packed.shape[1]
+        w0 = i0 >> 6
+        w1 = ((i1 - 1) >> 6) + 1
+        for w in range(w0, w1):
+            lo = max(i0, 64*w) - 64*w
+            hi = min(i1, 64*(w+1)) - 64*w
+            m = np.uint64(0)
+            for b in range(lo, hi):
+                m |= np.uint64(1) << np.uint64(b)
+            mask[w] = m
+        nseen = 0
+        for r in range(start, stop, step):
+            nonzero = False
+            for w in range(w0, w1):
+                if packed[r, w] & mask[w]:
+                    nonzero = True
+                    break
+            if not nonzero: continue
+            found = -1
+            for k in range(nseen):
+                s = seen[k]
+                equal = True
+                for w in range(w0, w1):
+                    if (packed[r, w] & mask[w]) != (packed[s, w] & mask[w]):
+                        equal = False
+                        break
+                if equal:
+                    found = s
+                    break
+            if found == -1:
+                seen[nseen] = r
+                nseen += 1
+            else:
+                for w in range(words):
+                    packed[r, w] ^= packed[found, w]
+                ops[nops, 0] = found
+                ops[nops, 1] = r
+                nops += 1
+        return nops
+
+    @numba.njit(cache=True, nogil=True)
+    def _gauss_gf2(packed, cols, full_reduce, blocksize, ops): # type: ignore
+        """Compiled version of :func:`_gauss_packed`. The row operations are written into
+        the (n,2)-array ``ops``, and the rank and the number of row operations are returned."""
+        rows, words = packed.shape
+        nops = 0
+        pcols = np.empty(min(rows, cols), dtype=np.int64)
+        npcols = 0
+        seen = np.empty(rows, dtype=np.int64)
+        mask = np.zeros(words, dtype=np.uint64)
+        nsec = (cols + blocksize - 1) // blocksize
+        one = np.uint64(1)
+
+        pivot_row = 0
+        for sec in range(nsec):
+            i0 = sec * blocksize
+            i1 = min(cols, (sec+1) * blocksize)
+            nops = _eliminate_chunks(packed, ops, nops, pivot_row, rows, 1, i0, i1, seen, mask)
+            for p in range(i0, i1):
+                if pivot_row == rows: break
+                w = p >> 6
+                b = np.uint64(p & 63)
+                r0 = pivot_row
+                while r0 < rows and not ((packed[r0, w] >> b) & one): r0 += 1
+                if r0 == rows: continue
+                if r0 != pivot_row:
+                    for k in range(words):
+                        packed[pivot_row, k] ^= packed[r0, k]
+                    ops[nops, 0] = r0
+                    ops[nops, 1] = pivot_row
+                    nops += 1
+                for r1 in range(pivot_row+1, rows):
+                    if (packed[r1, w] >> b) & one:
+                        for k in range(words):
+                            packed[r1, k] ^= packed[pivot_row, k]
+                        ops[nops, 0] = pivot_row
+                        ops[nops, 1] = r1
+                        nops += 1
+                if full_reduce:
+                    pcols[npcols] = p
+                    npcols += 1
+                pivot_row += 1
+
+        rank = pivot_row
+
+        if full_reduce:
+            pivot_row -= 1
+            for sec in range(nsec - 1, -1, -1):
+                i0 = sec * blocksize
+                i1 = min(cols, (sec+1) * blocksize)
+                nops = _eliminate_chunks(packed, ops, nops, pivot_row, -1, -1, i0, i1, seen, mask)
+                while npcols != 0 and i0 <= pcols[npcols-1] < i1:
+                    npcols -= 1
+                    pcol = pcols[npcols]
+                    w = pcol >> 6
+                    b = np.uint64(pcol & 63)
+                    for r in range(0, pivot_row):
+                        if (packed[r, w] >> b) & one:
+                            for k in range(words):
+                                packed[r, k] ^= packed[pivot_row, k]
+                            ops[nops, 0] = pivot_row
+                            ops[nops, 1] = r
+                            nops += 1
+                    pivot_row -= 1
+
+        return rank, nops
+
+    @numba.njit(cache=True, nogil=True)
+    def _eliminate_chunks_word(words, ops, nops, start, stop, step, i0, i1, seen): # type: ignore
+        """Version of :func:`_eliminate_chunks` for :func:`_gauss_gf2_word`."""
+        mask = np.uint64(0)
+        for b in range(i0, i1):
+            mask |= np.uint64(1) << np.uint64(b)
+        nseen = 0
+        for r in range(start, stop, step):
+            chunk = words[r] & mask
+            if not chunk: continue
+            found = -1
+            for k in range(nseen):
+                if words[seen[k]] & mask == chunk:
+                    found = seen[k]
+                    break
+            if found == -1:
+                seen[nseen] = r
+                nseen += 1
+            else:
+                words[r] ^= words[found]
+                ops[nops, 0] = found
+                ops[nops, 1] = r
+                nops += 1
+        return nops
+
+    @numba.njit(cache=True, nogil=True)
+    def _gauss_gf2_word(words, cols, full_reduce, blocksize, ops): # type: ignore
+        """Version of :func:`_gauss_gf2` for matrices with at most 64 columns, which are given
+        as a 1D-array holding a single word per row. This is the common case in circuit extraction,
+        where the matrices are indexed by the qubits, and every row addition is a single XOR."""
+        rows = words.shape[0]
+        nops = 0
+        pcols = np.empty(min(rows, cols), dtype=np.int64)
+        npcols = 0
+        seen = np.empty(rows, dtype=np.int64)
+        nsec = (cols + blocksize - 1) // blocksize
+        one = np.uint64(1)
+
+        pivot_row = 0
+        for sec in range(nsec):
+            i0 = sec * blocksize
+            i1 = min(cols, (sec+1) * blocksize)
+            nops = _eliminate_chunks_word(words, ops, nops, pivot_row, rows, 1, i0, i1, seen)
+            for p in range(i0, i1):
+                if pivot_row == rows: break
+                bit = one << np.uint64(p)
+                r0 = pivot_row
+                while r0 < rows and not (words[r0] & bit): r0 += 1
+                if r0 == rows: continue
+                if r0 != pivot_row:
+                    words[pivot_row] ^= words[r0]
+                    ops[nops, 0] = r0
+                    ops[nops, 1] = pivot_row
+                    nops += 1
+                pivot = words[pivot_row]
+                for r1 in range(pivot_row+1, rows):
+                    if words[r1] & bit:
+                        words[r1] ^= pivot
+                        ops[nops, 0] = pivot_row
+                        ops[nops, 1] = r1
+                        nops += 1
+                if full_reduce:
+                    pcols[npcols] = p
+                    npcols += 1
+                pivot_row += 1
+
+        rank = pivot_row
+
+        if full_reduce:
+            pivot_row -= 1
+            for sec in range(nsec - 1, -1, -1):
+                i0 = sec * blocksize
+                i1 = min(cols, (sec+1) * blocksize)
+                nops = _eliminate_chunks_word(words, ops, nops, pivot_row, -1, -1, i0, i1, seen)
+                while npcols != 0 and i0 <= pcols[npcols-1] < i1:
+                    npcols -= 1
+                    bit = one << np.uint64(pcols[npcols])
+                    pivot = words[pivot_row]
+                    for r in range(0, pivot_row):
+                        if words[r] & bit:
+                            words[r] ^= pivot
+                            ops[nops, 0] = pivot_row
+                            ops[nops, 1] = r
+                            nops += 1
+                    pivot_row -= 1
+
+        return rank, nops
+
+    @numba.njit(cache=True, nogil=True)
+    def _xor_rows(packed, ops): # type: ignore
+        """Compiled version of :func:`_apply_row_ops`, for an (n,2)-array ``ops``."""
+        words = packed.shape[1]
+        for i in range(ops.shape[0]):
+            r0 = ops[i, 0]
+            r1 = ops[i, 1]
+            for k in range(words):
+                packed[r1, k] ^= packed[r0, k]
+else:
+    _gauss_gf2 = None
+    _gauss_gf2_word = None
+    _xor_rows = None
+
+def _gauss_rows(
+        packed: np.ndarray, 
+        cols: int, 
+        full_reduce: bool, 
+        blocksize: int
+        ) -> Tuple[int, List[Tuple[int,int]]]:
+    """Performs Gaussian elimination on a packed matrix, using the compiled kernel
+    :func:`_gauss_gf2` (or :func:`_gauss_gf2_word` when the rows fit in a single word)
+    if numba is available and :func:`_gauss_packed` otherwise.
+    The compiled kernels are single-threaded, release the GIL and only touch the arrays
+    passed to them, so eliminations on different matrices (e.g. extractions of independent
+    graphs) can run concurrently from several Python threads. The kernels are compiled on
+    the first call, which holds numba's compiler lock until compilation has finished."""
+    if _gauss_gf2 is None:
+        return _gauss_packed(packed, cols, full_reduce, blocksize)
+    rows = packed.shape[0]
+    # every pivot and every chunk elimination adds at most one row to each other row
+    max_ops = 2 * rows * (math.ceil(cols / blocksize) + min(rows, cols))
+    ops = np.empty((max_ops, 2), dtype=np.int64)
+    if packed.shape[1] == 1:
+        words = np.ascontiguousarray(packed[:, 0])
+        rank, nops = _gauss_gf2_word(words, cols, bool(full_reduce), blocksize, ops)
+        packed[:, 0] = words
+    else:
+        rank, nops = _gauss_gf2(packed, cols, bool(full_reduce), blocksize, ops)
+    return rank, [(r0, r1) for r0, r1 in ops[:nops].tolist()]
+
+def _apply_row_ops(packed: np.ndarray, ops: List[Tuple[int,int]]) -> None:
+    """Applies the row operations ``(r0, r1)`` (meaning: add row r0 to r1) in order,
+    in place on a matrix packed by :func:`_pack_rows`."""
+    if _xor_rows is not None:
+        _xor_rows(packed, np.array(ops, dtype=np.int64).reshape(-1, 2))
+    else:
+        for r0, r1 in ops:
+            packed[r1] ^= packed[r0]
+
 class Mat2(object):
     """A matrix over Z2, with methods for multiplication, primitive row and column
     operations, Gaussian elimination, rank, and epi-mono factorisation."""
@@ -63,13 +405,24 @@ class Mat2(object):
         return len(self.data)
     def cols(self) -> int:
         return len(self.data[0]) if (len(self.data) != 0) else 0
+    def _set_rows(self, bits: np.ndarray) -> None:
+        """Overwrites the entries of the matrix in place by those of the 0/1-array ``bits``."""
+        if isinstance(self.data, np.ndarray):
+            self.data[:] = bits
+        else:
+            for row, new in zip(self.data, bits.tolist()):
+                row[:] = new
     def row_add(self, r0: int, r1: int) -> None:
         """Add r0 to r1"""
-        row1 = self.data[r0]
-        row2 = self.data[r1]
-        for i, v in enumerate(row1):
-            if v:
-                row2[i] = 0 if row2[i] else 1
+        if isinstance(self.data, np.ndarray):
+            if self.data.dtype.kind in 'biu':
+                self.data[r1] ^= self.data[r0]
+            else:
+                # e.g. the float matrices built from np.identity, which have no bitwise XOR
+                self.data[r1] = self.data[r1] != self.data[r0]
+        else:
+            row2 = self.data[r1]
+            row2[:] = map(operator.xor, row2, self.data[r0])
     def col_add(self, c0: int, c1: int) -> None:
         """Add r0 to r1"""
         for i in range(self.rows()):
@@ -115,85 +468,37 @@ class Mat2(object):
 
         Note x and y need not be matrices. x can be any object that implements the method
         row_add(), and y any object that implements col_add().
+
+        The elimination itself is performed on a bit-packed copy of the rows (see :func:`_gauss_rows`),
+        after which the row operations are replayed on x and y. When x is a :class:`Mat2` they are
+        replayed on a bit-packed copy of x as well.
         """
 
         rows = self.rows()
         cols = self.cols()
-        pcols = []
-        pivot_row = 0
-        for sec in range(math.ceil(cols / blocksize)):
-            i0 = sec * blocksize
-            i1 = min(cols, (sec+1) * blocksize)
-
-            # search for duplicate chunks of 'blocksize' bits and eliminate them
-            chunks: Dict[Tuple[Z2,...],int] = dict()
-            for r in range(pivot_row, rows):
-                t = tuple(self.data[r][i0:i1])
-                if not any(t): continue
-                if t in chunks:
-                    #print('hit (down)', r, chunks[t], t, i0, i1)
-                    self.row_add(chunks[t], r)
-                    if x is not None: x.row_add(chunks[t], r)
-                    if y is not None: y.col_add(r, chunks[t])
-                else:
-                    chunks[t] = r
-
-            p = i0
-            while p < i1:
-                for r0 in range(pivot_row, rows):
-                    if self.data[r0][p] != 0:
-                        if r0 != pivot_row:
-                            self.row_add(r0, pivot_row)
-                            if x is not None: x.row_add(r0, pivot_row)
-                            if y is not None: y.col_add(pivot_row, r0)
-
-                        for r1 in range(pivot_row+1, rows):
-                            if pivot_row != r1 and self.data[r1][p] != 0:
-                                self.row_add(pivot_row, r1)
-                                if x is not None: x.row_add(pivot_row, r1)
-                                if y is not None: y.col_add(r1, pivot_row)
-                        if full_reduce: pcols.append(p)
-                        pivot_row += 1
-                        break
-                p += 1
-        
-        rank = pivot_row
-
-        if full_reduce:
-            pivot_row -= 1
-
-            for sec in range(math.ceil(cols / blocksize) - 1, -1, -1):
-                i0 = sec * blocksize
-                i1 = min(cols, (sec+1) * blocksize)
-
-                # search for duplicate chunks of 'blocksize' bits and eliminate them
-                chunks = dict()
-                for r in range(pivot_row, -1, -1):
-                    t = tuple(self.data[r][i0:i1])
-                    if not any(t): continue
-                    if t in chunks:
-                        #print('hit (up)', r, chunks[t], t, i0, i1)
-                        self.row_add(chunks[t], r)
-                        if x is not None: x.row_add(chunks[t], r)
-                        if y is not None: y.col_add(r, chunks[t])
-                    else:
-                        chunks[t] = r
-
-                while len(pcols) != 0 and i0 <= pcols[-1] < i1:
-                    pcol = pcols.pop()
-                    for r in range(0, pivot_row):
-                        if self.data[r][pcol] != 0:
-                            self.row_add(pivot_row, r)
-                            if x is not None: x.row_add(pivot_row, r)
-                            if y is not None: y.col_add(r, pivot_row)
-                    pivot_row -= 1
-
+        if rows == 0 or cols == 0: return 0
+        packed = _pack_rows(self.data, cols)
+        rank, ops = _gauss_rows(packed, cols, full_reduce, blocksize)
+        if ops: self._set_rows(_unpack_rows(packed, cols))
+        if isinstance(x, Mat2) and ops and x.cols() != 0:
+            # x is a matrix as well, so the row operations can be replayed on its packed rows
+            px = _pack_rows(x.data, x.cols())
+            _apply_row_ops(px, ops)
+            x._set_rows(_unpack_rows(px, x.cols()))
+            x = None
+        for r0, r1 in ops:
+            if x is not None: x.row_add(r0, r1)
+            if y is not None: y.col_add(r1, r0)
         return rank
 
     def rank(self) -> int:
         """Returns the rank of the matrix."""
-        m = self.copy()
-        return m.gauss()
+        rows = self.rows()
+        cols = self.cols()
+        if rows == 0 or cols == 0: return 0
+        # There is no need to copy the matrix, as the elimination happens on the packed rows
+        rank, _ = _gauss_rows(_pack_rows(self.data, cols), cols, False, 6)
+        return rank
 
     def factor(self) -> Tuple['Mat2','Mat2']:
         """Produce a factorisation m = m0 * m1, where
@@ -245,30 +550,29 @@ class Mat2(object):
     def nullspace(self, should_copy:bool=True) -> List[List[Z2]]:
         """Returns a list of non-zero vectors that span the nullspace
         of the matrix. If the matrix has trivial kernel it returns the empty list."""
+        cols = self.cols()
+        if cols == 0: return []
         if gauss_fast:
-            data = gauss_fast(self.data,1)
-            m = Mat2(data)
-        elif should_copy:
-            m = self.copy()
-            m.gauss(full_reduce=True)
+            packed = _pack_rows(gauss_fast(self.data,1), cols)
         else:
-            m = self
-            m.gauss(full_reduce=True)
-        cols = self.cols()
-        nonpivots = list(range(cols))
+            packed = _pack_rows(self.data, cols)
+            _, ops = _gauss_rows(packed, cols, True, 6)
+            if not should_copy and ops: self._set_rows(_unpack_rows(packed, cols))
+        # The pivot of a row of the reduced matrix is its lowest set bit
         pivots = []
-        for i, r in enumerate(m.data):
-            for j in range(cols):
-                if r[j]:
-                    nonpivots.remove(j)
-                    pivots.append(j)
+        for row in packed.tolist():
+            for w, word in enumerate(row):
+                if word:
+                    pivots.append(64*w + (word & -word).bit_length() - 1)
                     break
+        pivot_rows = packed[:len(pivots)]
+        nonpivots = sorted(set(range(cols)).difference(pivots))
         vectors:List[List[Z2]] = []
         for n in nonpivots:
             v:List[Z2] = [0]*cols
             v[n] = 1
-            for r, p in zip(m.data, pivots):
-                if r[n]: v[p] = 1
+            for p, bit in zip(pivots, _column(pivot_rows, n).tolist()):
+                if bit: v[p] = 1
             vectors.append(v)
         return vectors
 
@@ -279,16 +583,18 @@ class Mat2(object):
             cn = CNOTMaker()
             self.copy().gauss(full_reduce=True,x=cn, blocksize=5)
         else:
-            best = 1000000
-            best_cn = None
+            # We pack the matrix once, and only turn the shortest sequence of row operations into CNOTs
+            cols = self.cols()
+            packed = _pack_rows(self.data, cols) if cols != 0 else None
+            best_ops: Optional[List[Tuple[int,int]]] = None
             for size in range(1,self.rows()):
+                ops = _gauss_rows(packed.copy(), cols, True, size)[1] if packed is not None else []
+                if best_ops is None or len(ops) < len(best_ops):
+                    best_ops = ops
+            cn = None
+            if best_ops is not None:
                 cn = CNOTMaker()
-                assert cn is not None
-                self.copy().gauss(full_reduce=True,x=cn, blocksize=size)
-                if len(cn.cnots) < best:
-                    best = len(cn.cnots)
-                    best_cn = cn
-            cn = best_cn
+                for r0, r1 in best_ops: cn.row_add(r0, r1)
         assert cn is not None
         return cn.cnots # list(reversed(cn.cnots)) 
 
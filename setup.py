@@ -32,6 +32,6 @@ setup(
     ],
     python_requires='>=3.6',
     install_requires=["typing_extensions>=3.7.4",
-                      "numpy>=1.12"],
+                      "numpy>=1.17"],
     include_package_data=True,
 )
@@ -32,7 +32,9 @@ from pyzx.circuit import Circuit
 from pyzx.circuit.gates import CNOT
 from pyzx.generate import cliffordT, cliffords
 from pyzx.simplify import clifford_simp
-from pyzx.extract import extract_circuit
+from pyzx.linalg import Mat2
+from pyzx import extract
+from pyzx.extract import extract_circuit, permutation_as_swaps, find_minimal_sums
 
 SEED = 1337
 
@@ -67,8 +69,72 @@ class TestExtract(unittest.TestCase):
                 cnot_count+=1
         self.assertTrue(cnot_count==4)
         self.assertTrue(c.verify_equality(c2))
+
+    def test_permutation_as_swaps(self):
+        random.seed(SEED)
+        for n in range(1,8):
+            perm = list(range(n))
+            random.shuffle(perm)
+            swaps = permutation_as_swaps(dict(enumerate(perm)))
+            cycles = 0
+            seen = set()
+            for i in range(n):
+                if i in seen: continue
+                cycles += 1
+                j = i
+                while j not in seen:
+                    seen.add(j)
+                    j = perm[j]
+            with self.subTest(perm=perm):
+                self.assertEqual(len(swaps), n - cycles)
+                l = list(range(n))
+                for t1, t2 in swaps:
+                    l[t1], l[t2] = l[t2], l[t1]
+                self.assertEqual([l[perm[i]] for i in range(n)], list(range(n)))
         
 
+@unittest.skipUnless(extract.find_minimal_sums_fast, "the extract_c module needs to be compiled for this to run")
+class TestExtractCompiled(unittest.TestCase):
+
+    def minimal_sums(self, m, compiled):
+        fast = extract.find_minimal_sums_fast
+        if not compiled: extract.find_minimal_sums_fast = None
+        try:
+            return find_minimal_sums(m)
+        finally:
+            extract.find_minimal_sums_fast = fast
+
+    def test_find_minimal_sums(self):
+        random.seed(SEED)
+        for i in range(200):
+            rows = random.randint(2,12)
+            cols = random.choice([4,10,64,65,130])
+            data = [[int(random.random() < 0.3) for _ in range(cols)] for _ in range(rows)]
+            if i % 2:
+                # Make the last row a single 1 plus a sum of some other rows
+                p = random.randrange(cols)
+                row = [int(j == p) for j in range(cols)]
+                for k in random.sample(range(rows-1), random.randint(1,min(4,rows-1))):
+                    row = [a ^ b for a,b in zip(row, data[k])]
+                data[-1] = row
+            m = Mat2(data)
+            with self.subTest(i=i):
+                self.assertEqual(self.minimal_sums(m, True), self.minimal_sums(m, False))
+
+    def test_find_minimal_sums_iteration_limit(self):
+        random.seed(SEED)
+        # Every row has an even number of ones, so no sum of rows has a single 1
+        for cols in (20,100):
+            data = []
+            for i in range(25):
+                row = [random.randint(0,1) for _ in range(cols-1)]
+                data.append(row + [sum(row) % 2])
+                if not any(data[-1]): data[-1][:2] = [1,1]
+            m = Mat2(data)
+            with self.subTest(cols=cols):
+                self.assertIsNone(self.minimal_sums(m, True))
+                self.assertIsNone(self.minimal_sums(m, False))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
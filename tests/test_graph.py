@@ -25,7 +25,9 @@ if __name__ == '__main__':
     sys.path.append('.')
 
 from pyzx.graph import Graph, EdgeType, VertexType
-from pyzx.generate import identity
+from pyzx.graph.graph import backends
+from pyzx.generate import identity, cliffordT
+from pyzx.simplify import full_reduce
 
 import numpy as np
 from pyzx.tensor import compare_tensors
@@ -61,6 +63,8 @@ class TestGraphBasicMethods(unittest.TestCase):
         self.assertEqual(g.edge_type(e),EdgeType.SIMPLE)
         g.set_edge_type(e,EdgeType.HADAMARD)
         self.assertEqual(g.edge_type(e),EdgeType.HADAMARD)
+        self.assertEqual(g.edge_type_between(v2,v1),EdgeType.HADAMARD)
+        self.assertEqual(g.edge_type_between(v1,v3),0)
         g.remove_edge(e)
         self.assertEqual(g.num_edges(),0)
         self.assertFalse(g.connected(v1,v2))
@@ -154,6 +158,35 @@ class TestGraphBasicMethods(unittest.TestCase):
                         self.assertEqual(g2.num_vertices(),0)
                         self.assertTrue(compare_tensors(g,g2))
 
+
+@unittest.skipUnless('rustworkx' in backends, "rustworkx needs to be installed for this to run")
+class TestGraphRustworkx(unittest.TestCase):
+
+    def test_vertices_keep_their_index(self):
+        g = Graph('rustworkx')
+        v1, v2, v3 = g.add_vertices(3)
+        g.add_edge((v1,v3),EdgeType.HADAMARD)
+        g.remove_vertex(v2)
+        v4 = g.add_vertex()
+        self.assertEqual(v4, 3)
+        self.assertEqual(set(g.vertices()), {v1,v3,v4})
+        self.assertEqual(list(g.neighbours(v3)), [v1])
+        self.assertFalse(g.connected(v1,v4))
+        self.assertEqual(g.edge_type(g.edge(v1,v3)),EdgeType.HADAMARD)
+        self.assertEqual(g.edge_type(g.edge(v1,v4)),0)
+        self.assertEqual(g.edge_type_between(v3,v1),EdgeType.HADAMARD)
+        self.assertEqual(g.edge_type_between(v1,v4),0)
+        self.assertEqual(list(g.edges()), [(v1,v3)])
+
+    def test_copy_to_and_from_simple(self):
+        g = cliffordT(3,30)
+        g2 = g.copy(backend='rustworkx')
+        self.assertEqual(g2.backend, 'rustworkx')
+        self.assertEqual(g.num_vertices(),g2.num_vertices())
+        self.assertEqual(g.num_edges(),g2.num_edges())
+        full_reduce(g2,quiet=True)
+        self.assertTrue(compare_tensors(g,g2.copy(backend='simple'),False))
+
 class TestGraphCircuitMethods(unittest.TestCase):
 
     def setUp(self):
@@ -21,7 +21,11 @@ if __name__ == '__main__':
     sys.path.append('..')
     sys.path.append('.')
 
+import random
+import numpy as np
+
 from pyzx.linalg import Mat2
+from pyzx import linalg
 
 
 class TestMat2(unittest.TestCase):
@@ -56,6 +60,15 @@ class TestMat2(unittest.TestCase):
                 if self.m3.data[i][j] != 0: flagged = True
         self.assertFalse(flagged)
 
+    def test_row_add_of_float_matrix(self):
+        m = Mat2(np.identity(3))
+        l = Mat2.id(3)
+        for r0, r1 in [(0,1), (1,2), (0,2), (2,0)]:
+            m.row_add(r0, r1)
+            l.row_add(r0, r1)
+        self.assertEqual(m.data.dtype, np.float64)
+        self.assertEqual(m.data.tolist(), l.data)
+
     def test_rank_of_matrix(self):
         self.assertEqual(self.m3.rank(),4)
 
@@ -75,11 +88,36 @@ class TestMat2(unittest.TestCase):
         x = self.m4.solve(b)
         self.assertEqual(self.m4*x, b)
 
+    def test_nullspace(self):
+        vectors = self.m3.nullspace()
+        self.assertEqual(len(vectors), self.m3.cols() - self.m3.rank())
+        for v in vectors:
+            self.assertEqual(self.m3*Mat2([[a] for a in v]), Mat2([[0]]*self.m3.rows()))
+        self.assertEqual(self.m4.nullspace(), [])
+
     def test_factor(self):
         m0, m1 = self.m3.factor()
         self.assertEqual(m0.cols(),self.m3.rank())
         self.assertEqual(m1.rows(),self.m3.rank())
         self.assertEqual(m0*m1, self.m3)
 
+@unittest.skipUnless(linalg._gauss_gf2 is not None, "numba needs to be installed for this to run")
+class TestGaussKernels(unittest.TestCase):
+
+    def test_compiled_gauss_agrees_with_packed(self):
+        rng = random.Random(1337)
+        for rows, cols in [(5,5), (20,12), (40,64), (30,65), (70,130), (100,40)]:
+            for rank in (min(rows,cols), rows // 2):
+                # A product of random matrices, so that the chunk elimination finds duplicate rows
+                m = Mat2([[rng.randint(0,1) for _ in range(rank)] for _ in range(rows)]) * \
+                    Mat2([[rng.randint(0,1) for _ in range(cols)] for _ in range(rank)])
+                for blocksize in (1, 3, 6, 64):
+                    for full_reduce in (False, True):
+                        expected = linalg._pack_rows(m.data, cols)
+                        packed = expected.copy()
+                        self.assertEqual(linalg._gauss_rows(packed, cols, full_reduce, blocksize),
+                                         linalg._gauss_packed(expected, cols, full_reduce, blocksize))
+                        self.assertTrue((packed == expected).all())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file